@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 """
 Batch process AIS data for all days in date range.
-Downloads, processes, and cleans up each day sequentially to save disk space.
+Downloads, processes, and cleans up each day in a pool of worker processes.
 Tracks progress in a text file for resume capability.
 """
 
+import argparse
+import atexit
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import date, timedelta
 from pathlib import Path
 
@@ -18,6 +22,11 @@ SCRIPT_DIR = Path(__file__).parent.resolve()
 DATA_DIR = SCRIPT_DIR / "data"
 OUTPUT_DIR = SCRIPT_DIR / "output"
 PROGRESS_FILE = SCRIPT_DIR / "progress.txt"
+PROGRESS_FSYNC_EVERY = 32  # completed days between fsyncs of the progress file
+
+# Open progress file descriptor and completions written since the last fsync
+_progress_fd: int | None = None
+_progress_unsynced = 0
 
 
 def load_completed_dates() -> set[str]:
@@ -29,28 +38,46 @@ def load_completed_dates() -> set[str]:
         return {line.strip() for line in f if line.strip()}
 
 
+def close_progress() -> None:
+    """Fsync and close the progress file (registered with atexit on first use)."""
+    global _progress_fd, _progress_unsynced
+
+    if _progress_fd is not None:
+        os.fsync(_progress_fd)
+        os.close(_progress_fd)
+        _progress_fd = None
+        _progress_unsynced = 0
+
+
 def mark_completed(date_str: str) -> None:
-    """Mark a date as completed in the progress file."""
-    with open(PROGRESS_FILE, "a") as f:
-        f.write(f"{date_str}\n")
+    """
+    Mark a date as completed in the progress file.
 
+    Lines are appended through one O_APPEND descriptor, each as a single
+    atomic write. The file is fsynced every PROGRESS_FSYNC_EVERY marks and at
+    exit; dates lost to a crash in between are simply reprocessed on resume.
+    """
+    global _progress_fd, _progress_unsynced
 
-def cleanup_download(date_str: str) -> None:
-    """Remove downloaded zip and csv files to save disk space."""
-    year, month, day = date_str.split("-")
-    zip_name = f"AIS_{year}_{month}_{day}.zip"
-    csv_name = f"AIS_{year}_{month}_{day}.csv"
+    if _progress_fd is None:
+        _progress_fd = os.open(PROGRESS_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        atexit.register(close_progress)
 
-    zip_path = DATA_DIR / zip_name
-    csv_path = DATA_DIR / csv_name
+    os.write(_progress_fd, f"{date_str}\n".encode())
+    _progress_unsynced += 1
 
-    if zip_path.exists():
-        os.remove(zip_path)
-        print(f"Deleted: {zip_path}")
+    if _progress_unsynced >= PROGRESS_FSYNC_EVERY:
+        os.fsync(_progress_fd)
+        _progress_unsynced = 0
 
-    if csv_path.exists():
-        os.remove(csv_path)
-        print(f"Deleted: {csv_path}")
+
+def cleanup_download(csv_path: Path) -> None:
+    """Remove the extracted csv file to save disk space."""
+    try:
+        csv_path.unlink()
+    except FileNotFoundError:
+        return
+    print(f"Deleted: {csv_path}")
 
 
 def generate_dates(start: str, end: str):
@@ -80,6 +107,8 @@ def process_date(d: date) -> bool:
     # Build URL
     url = AIS_URL_TEMPLATE.format(year=year, month=month, day=day)
 
+    csv_path = None
+
     try:
         # Download
         csv_path = download_ais(url, str(DATA_DIR))
@@ -89,7 +118,7 @@ def process_date(d: date) -> bool:
         result = process_ais(str(csv_path), str(OUTPUT_DIR), output_name)
 
         # Cleanup downloaded files
-        cleanup_download(date_str)
+        cleanup_download(csv_path)
 
         if result is None:
             print(f"No data for {date_str} (empty after filtering)")
@@ -98,13 +127,24 @@ def process_date(d: date) -> bool:
 
     except Exception as e:
         print(f"ERROR processing {date_str}: {e}")
-        # Still cleanup on error
-        cleanup_download(date_str)
+        # Still cleanup on error (a failed download leaves no csv behind)
+        if csv_path is not None:
+            cleanup_download(csv_path)
         return False
 
 
 def main():
     """Main batch processing loop."""
+    parser = argparse.ArgumentParser(description="Batch process AIS data for all days in range")
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Number of days to process concurrently (default: 1)",
+    )
+    args = parser.parse_args()
+
     print("AIS Batch Processor")
     print(f"Date range: {START_DATE} to {END_DATE}")
 
@@ -122,26 +162,34 @@ def main():
 
     print(f"Total days: {len(all_dates)}")
     print(f"Remaining: {len(remaining)}")
+    print(f"Workers: {args.workers}")
 
     if not remaining:
         print("All dates already processed!")
         return
 
-    # Process each date
+    # Process dates in parallel; progress is only written from this (parent) process
     success_count = 0
     error_count = 0
 
-    for i, d in enumerate(remaining):
-        date_str = d.isoformat()
-        print(f"\n[{i + 1}/{len(remaining)}] {date_str}")
-
-        success = process_date(d)
-
-        if success:
-            mark_completed(date_str)
-            success_count += 1
-        else:
-            error_count += 1
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(process_date, d): d for d in remaining}
+
+        for i, future in enumerate(as_completed(futures)):
+            date_str = futures[future].isoformat()
+            try:
+                success = future.result()
+            except BrokenProcessPool as e:
+                # A worker died (e.g. OOM-killed); this and all pending dates fail
+                print(f"ERROR processing {date_str}: {e}")
+                success = False
+            print(f"\n[{i + 1}/{len(remaining)}] {date_str}: {'done' if success else 'failed'}")
+
+            if success:
+                mark_completed(date_str)
+                success_count += 1
+            else:
+                error_count += 1
 
     print(f"\n{'=' * 60}")
     print("Batch processing complete!")
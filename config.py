@@ -5,15 +5,45 @@ Wind farm lease boundaries and vessel type filters.
 
 from pathlib import Path
 
+import polars as pl
+
 # Wind farm lease boundaries (BOEM geojson)
 LEASE_GEOJSON = (
     Path(__file__).parent / "geojson" / "Wind_Lease_Boundaries__BOEM__2752026592552254440.geojson"
 )
 
+# Pickled, pre-projected copy of the lease boundaries (rebuilt when the geojson changes)
+LEASE_CACHE = LEASE_GEOJSON.with_suffix(".wgs84.pkl")
+
 # Vessel types to EXCLUDE (not relevant to offshore wind operations)
 # 30 = Fishing, 36 = Sailing, 37 = Pleasure craft, 60-69 = Passenger ships
 EXCLUDED_VESSEL_TYPES = [30, 36, 37, *range(60, 70)]
 
+# Full column schema of the NOAA AIS CSV files, in file order. Passing it to
+# scan_csv skips polars' per-file type inference
+AIS_SCHEMA = {
+    "MMSI": pl.Int64,
+    "BaseDateTime": pl.Utf8,
+    "LAT": pl.Float32,
+    "LON": pl.Float32,
+    "SOG": pl.Float32,
+    "COG": pl.Float32,
+    "Heading": pl.Float32,
+    "VesselName": pl.Utf8,
+    "IMO": pl.Utf8,
+    "CallSign": pl.Utf8,
+    "VesselType": pl.Int16,
+    "Status": pl.Int16,
+    "Length": pl.Float32,
+    "Width": pl.Float32,
+    "Draft": pl.Float32,
+    "Cargo": pl.Int32,
+    "TransceiverClass": pl.Utf8,
+}
+
+# AIS CSV columns kept in the output (all other columns are never parsed)
+AIS_COLUMNS = ["MMSI", "BaseDateTime", "LAT", "LON", "VesselName", "VesselType"]
+
 # AIS data URL template
 AIS_URL_TEMPLATE = (
     "https://coast.noaa.gov/htdata/CMSP/AISDataHandler/{year}/AIS_{year}_{month:02d}_{day:02d}.zip"
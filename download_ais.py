@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 """
 Download AIS data from NOAA Marine Cadastre.
-Downloads zip files and extracts them, skipping if already downloaded.
+Downloads zip files and extracts the CSV from them, skipping if already downloaded.
 """
 
 import os
+import shutil
+import tempfile
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -14,15 +18,166 @@ from tqdm import tqdm
 
 STALL_TIMEOUT = 60  # seconds - restart download if no data received for this long
 MAX_RETRIES = 5
+CONNECTIONS = 5  # concurrent HTTP range requests per file
+CHUNK_SIZE = 1024 * 1024  # bytes per iter_content read - small chunks are interpreter-bound
+SPOOL_MAX_SIZE = 256 * 1024 * 1024  # zips larger than this spill from memory to a temp file
 
 
-def download_ais(url: str, data_dir: str = "data") -> Path:
+class RangeNotSupportedError(Exception):
+    """Raised when the server answers a Range request with the full body."""
+
+
+def _fetch_range(
+    url: str,
+    f,
+    lock: threading.Lock,
+    stop: threading.Event,
+    start: int,
+    end: int,
+    pbar: tqdm,
+) -> None:
+    """
+    Download bytes [start, end] of url and write them at the same offset in f.
+    Returns early once `stop` is set (another range failed).
+    """
+    headers = {"Range": f"bytes={start}-{end}"}
+    with requests.get(url, headers=headers, stream=True, timeout=(30, STALL_TIMEOUT)) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise RangeNotSupportedError(url)
+
+        offset = start
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if stop.is_set():
+                return
+            with lock:
+                f.seek(offset)
+                f.write(chunk)
+                pbar.update(len(chunk))
+            offset += len(chunk)
+
+
+def _download_ranged(url: str, f, total_size: int, connections: int, pbar: tqdm) -> None:
+    """Download url into f using `connections` concurrent range requests."""
+    # Preallocate so every worker can write at its own offset
+    f.truncate(total_size)
+
+    bounds = [total_size * i // connections for i in range(connections + 1)]
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        futures = [
+            executor.submit(_fetch_range, url, f, lock, stop, bounds[i], bounds[i + 1] - 1, pbar)
+            for i in range(connections)
+            if bounds[i + 1] > bounds[i]
+        ]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            # Make the other ranges bail out at their next chunk instead of finishing
+            stop.set()
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def _download_single(url: str, f, pbar: tqdm) -> None:
+    """Download url into f over a single streamed connection."""
+    with requests.get(url, stream=True, timeout=(30, STALL_TIMEOUT)) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            f.write(chunk)
+            pbar.update(len(chunk))
+
+
+def _content_length(url: str) -> int:
+    """
+    Get the size of url from a HEAD request.
+    Returns 0 if HEAD fails or reports no length, so the caller uses a single stream.
+    """
+    try:
+        # timeout=(connect_timeout, read_timeout) - read_timeout triggers if no data for 60s
+        head = requests.head(url, allow_redirects=True, timeout=(30, STALL_TIMEOUT))
+        head.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"\nHEAD request failed ({e}), using one stream")
+        return 0
+
+    return int(head.headers.get("content-length", 0))
+
+
+def _download_zip(url: str, f, filename: str, connections: int) -> None:
+    """Download url into the seekable file object f, retrying on stalls and errors."""
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            # Discard any partial data from a previous attempt
+            f.seek(0)
+            f.truncate()
+
+            total_size = _content_length(url)
+
+            with tqdm(total=total_size, unit="B", unit_scale=True, desc=filename) as pbar:
+                if connections > 1 and total_size > 0:
+                    try:
+                        _download_ranged(url, f, total_size, connections, pbar)
+                    except RangeNotSupportedError:
+                        print("\nServer does not support range requests, using one stream")
+                        f.seek(0)
+                        f.truncate()
+                        pbar.reset()
+                        _download_single(url, f, pbar)
+                else:
+                    _download_single(url, f, pbar)
+
+            return
+
+        except requests.exceptions.Timeout:
+            print(f"\nDownload stalled (no data for {STALL_TIMEOUT}s), attempt {attempt}/{MAX_RETRIES}")
+            if attempt == MAX_RETRIES:
+                raise RuntimeError(f"Download failed after {MAX_RETRIES} attempts due to stalls")
+            print("Restarting download...")
+
+        except requests.exceptions.RequestException as e:
+            print(f"\nDownload error: {e}, attempt {attempt}/{MAX_RETRIES}")
+            if attempt == MAX_RETRIES:
+                raise
+            print("Restarting download...")
+
+
+def _extract_csv(src, csv_path: Path) -> None:
+    """Extract the CSV member of a zip (path or file object) to csv_path."""
+    with zipfile.ZipFile(src) as zf:
+        member = next(name for name in zf.namelist() if name.endswith(".csv"))
+        try:
+            with zf.open(member) as fsrc, open(csv_path, "wb") as fdst:
+                shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE)
+        except BaseException:
+            # Never leave a truncated CSV behind - it would be mistaken for a finished one
+            csv_path.unlink(missing_ok=True)
+            raise
+
+
+def download_ais(
+    url: str,
+    data_dir: str = "data",
+    connections: int = CONNECTIONS,
+    keep_zip: bool = False,
+) -> Path:
     """
     Download AIS zip file from NOAA and extract it.
 
+    The file is split into byte ranges fetched over `connections` concurrent
+    requests, falling back to a single stream if the server ignores Range.
+    The zip is held in a temporary spool and the CSV extracted straight from
+    it, so only the CSV is left on disk unless `keep_zip` is set.
+
     Args:
         url: URL to the AIS zip file
         data_dir: Directory to store downloaded files
+        connections: Number of concurrent range requests (1 disables splitting)
+        keep_zip: Also save the downloaded zip file in data_dir
 
     Returns:
         Path to the extracted CSV file
@@ -41,51 +196,33 @@ def download_ais(url: str, data_dir: str = "data") -> Path:
         print(f"CSV already exists: {csv_path}")
         return csv_path
 
-    # Check if zip already exists (downloaded but not extracted)
-    if not zip_path.exists():
-        print(f"Downloading {url}...")
-
-        for attempt in range(1, MAX_RETRIES + 1):
-            try:
-                # Stream download with progress bar
-                # timeout=(connect_timeout, read_timeout) - read_timeout triggers if no data for 60s
-                response = requests.get(url, stream=True, timeout=(30, STALL_TIMEOUT))
-                response.raise_for_status()
-
-                total_size = int(response.headers.get("content-length", 0))
-
-                with open(zip_path, "wb") as f:
-                    with tqdm(total=total_size, unit="B", unit_scale=True, desc=filename) as pbar:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                            pbar.update(len(chunk))
-
-                print(f"Downloaded: {zip_path}")
-                break  # Success, exit retry loop
-
-            except requests.exceptions.Timeout:
-                print(f"\nDownload stalled (no data for {STALL_TIMEOUT}s), attempt {attempt}/{MAX_RETRIES}")
-                # Remove partial download
-                if zip_path.exists():
-                    os.remove(zip_path)
-                if attempt == MAX_RETRIES:
-                    raise RuntimeError(f"Download failed after {MAX_RETRIES} attempts due to stalls")
-                print("Restarting download...")
-
-            except requests.exceptions.RequestException as e:
-                print(f"\nDownload error: {e}, attempt {attempt}/{MAX_RETRIES}")
-                if zip_path.exists():
-                    os.remove(zip_path)
-                if attempt == MAX_RETRIES:
-                    raise
-                print("Restarting download...")
-    else:
+    # Check if zip already exists (downloaded with keep_zip but not extracted)
+    if zip_path.exists():
         print(f"Zip already exists: {zip_path}")
+        print(f"Extracting {zip_path}...")
+        _extract_csv(zip_path, csv_path)
+        print(f"Extracted: {csv_path}")
+        return csv_path
+
+    print(f"Downloading {url}...")
+
+    if keep_zip:
+        target = open(zip_path, "w+b")
+    else:
+        target = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, dir=data_path)
+
+    with target as f:
+        try:
+            _download_zip(url, f, filename, connections)
+        except BaseException:
+            if keep_zip:
+                zip_path.unlink(missing_ok=True)
+            raise
+
+        print(f"Downloaded: {zip_path if keep_zip else filename}")
 
-    # Extract the zip file
-    print(f"Extracting {zip_path}...")
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(data_path)
+        print(f"Extracting {filename}...")
+        _extract_csv(f, csv_path)
 
     print(f"Extracted: {csv_path}")
     return csv_path
@@ -1,19 +1,56 @@
 """
-Merge daily GeoPackage files into a single GeoParquet file.
+Merge daily GeoParquet (or legacy GeoPackage) files into a single GeoParquet file.
 Optimized for PostGIS upload via ogr2ogr or geopandas.
 """
 
 import argparse
-import gc
+import json
+import os
 import re
+import sqlite3
+from collections import deque
 from collections.abc import Iterator
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import date
 from pathlib import Path
 
-import geopandas as gpd
-import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyogrio
+from pyproj import CRS
 from tqdm import tqdm
 
+from config import AIS_COLUMNS, AIS_SCHEMA
+
+DAILY_FILE_PATTERN = re.compile(r"ais_(\d{4})_(\d{2})_(\d{2})\.(?:parquet|gpkg)$")
+READ_WORKERS = 8  # daily files read concurrently (reads are GIL-free I/O and decoding)
+
+# GeoParquet metadata for the merged file (daily geometries are WKB points in WGS84)
+GEO_METADATA = {
+    "version": "1.1.0",
+    "primary_column": "geometry",
+    "columns": {
+        "geometry": {
+            "encoding": "WKB",
+            "geometry_types": ["Point"],
+            "crs": CRS.from_epsg(4326).to_json_dict(),
+        },
+    },
+}
+
+# Fixed schema of the merged file: the daily output columns (typed as in the CSV
+# scan), the matched lease and the WKB geometry - independent of which files are merged
+OUTPUT_SCHEMA = pa.schema(
+    [
+        *pl.DataFrame(schema={col: AIS_SCHEMA[col] for col in AIS_COLUMNS}).to_arrow().schema,
+        pa.field("LEASE_NUMBER", pa.large_string()),
+        pa.field("geometry", pa.binary()),
+    ],
+    metadata={b"geo": json.dumps(GEO_METADATA)},
+)
+
 
 def get_gpkg_files(
     output_dir: Path,
@@ -21,122 +58,184 @@ def get_gpkg_files(
     end_date: str | None = None,
 ) -> list[Path]:
     """
-    Get list of GeoPackage files, optionally filtered by date range.
+    Get list of daily output files, optionally filtered by date range.
+
+    Daily files are GeoParquet; GeoPackage files from earlier runs are
+    picked up too so they can still be merged. If a date has both, the
+    GeoParquet file wins so its rows are not merged twice.
 
     Args:
-        output_dir: Directory containing gpkg files
+        output_dir: Directory containing daily parquet/gpkg files
         start_date: Optional start date (YYYY-MM-DD)
         end_date: Optional end date (YYYY-MM-DD)
 
     Returns:
-        Sorted list of Path objects for gpkg files
+        Sorted list of Path objects for daily files
     """
-    pattern = re.compile(r"ais_(\d{4})_(\d{2})_(\d{2})\.gpkg$")
-    files = []
+    files: dict[date, Path] = {}
 
-    start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
-    end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+    start = date.fromisoformat(start_date) if start_date else None
+    end = date.fromisoformat(end_date) if end_date else None
 
-    for f in output_dir.glob("ais_*.gpkg"):
-        match = pattern.match(f.name)
+    # Single directory pass; names are matched without stat-ing each entry
+    for entry in os.scandir(output_dir):
+        match = DAILY_FILE_PATTERN.match(entry.name)
         if match:
-            year, month, day = map(int, match.groups())
-            file_date = datetime(year, month, day).date()
+            file_date = date(int(match[1]), int(match[2]), int(match[3]))
 
             if start and file_date < start:
                 continue
             if end and file_date > end:
                 continue
 
-            files.append(f)
+            path = output_dir / entry.name
+            existing = files.get(file_date)
+            if existing is not None:
+                # Same date in both formats: keep the parquet, skip the gpkg
+                keep, skip = (path, existing) if path.suffix == ".parquet" else (existing, path)
+                print(f"Skipping {skip.name}: {keep.name} covers the same date")
+                path = keep
 
-    return sorted(files)
+            files[file_date] = path
 
+    return [files[file_date] for file_date in sorted(files)]
 
-def iter_gdfs(
-    gpkg_files: list[Path],
-    batch_size: int = 10,
-) -> Iterator[gpd.GeoDataFrame]:
+
+def read_daily(path: Path) -> pa.Table:
     """
-    Lazily iterate over GeoDataFrames, yielding combined batches.
+    Read one daily output file (GeoParquet, or legacy GeoPackage) as an Arrow table.
 
-    Memory-efficient: loads `batch_size` files at a time, concatenates,
-    and yields. This keeps memory usage bounded.
+    GeoPackage layers are read straight into Arrow by pyogrio, without a
+    GeoDataFrame round-trip; the geometry column is renamed to "geometry".
+    """
+    if path.suffix == ".parquet":
+        return pq.read_table(path)
+
+    meta, table = pyogrio.read_arrow(path)
+    geometry_name = meta["geometry_name"] or "wkb_geometry"
+    return table.rename_columns(
+        ["geometry" if name == geometry_name else name for name in table.column_names]
+    )
+
+
+def count_rows(path: Path) -> int | None:
+    """
+    Count rows in a daily output file from its metadata, without reading any data.
+
+    Uses the Parquet footer, or the GeoPackage gpkg_ogr_contents table
+    (falling back to COUNT(*) if GDAL did not record a feature count).
+    Best-effort: returns None if the count cannot be determined.
+    """
+    try:
+        if path.suffix == ".parquet":
+            return pq.ParquetFile(path).metadata.num_rows
+
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            row = conn.execute("SELECT table_name, feature_count FROM gpkg_ogr_contents").fetchone()
+            if row is None:
+                return None
+            table_name, feature_count = row
+            if feature_count is None:
+                feature_count = conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+            return feature_count
+    except (OSError, sqlite3.Error, pa.ArrowException):
+        return None
+
+
+def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """
+    Reorder and cast a table's columns to match schema.
+
+    Columns missing from the table are filled with nulls and extra columns
+    are dropped, so legacy GeoPackage files (all CSV columns, float64) and
+    dailies with all-null (Arrow null typed) columns fit OUTPUT_SCHEMA.
+    """
+    columns = [
+        table[field.name].cast(field.type)
+        if field.name in table.column_names
+        else pa.nulls(table.num_rows, field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def iter_tables(files: list[Path], workers: int = READ_WORKERS) -> Iterator[pa.Table]:
+    """
+    Read daily files on a thread pool, yielding tables in file order.
+
+    At most `workers` files are read ahead of the consumer, so memory stays
+    bounded even when writing is slower than reading.
 
     Args:
-        gpkg_files: List of GeoPackage file paths
-        batch_size: Number of files to load per batch
+        files: List of daily file paths
+        workers: Number of concurrent reads
 
     Yields:
-        GeoDataFrame for each batch
+        Arrow table for each file
     """
-    for i in range(0, len(gpkg_files), batch_size):
-        batch_files = gpkg_files[i : i + batch_size]
-        gdfs = [gpd.read_file(f) for f in batch_files]
-        combined = pd.concat(gdfs, ignore_index=True)
-        # Ensure it's a GeoDataFrame with proper CRS
-        combined = gpd.GeoDataFrame(combined, crs="EPSG:4326")
-        yield combined
-        # Explicit cleanup
-        del gdfs
-        del combined
-        gc.collect()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for f in files:
+            pending.append(executor.submit(read_daily, f))
+            if len(pending) > workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
 def merge_to_parquet(
     gpkg_files: list[Path],
     output_path: Path,
-    batch_size: int = 10,
+    workers: int = READ_WORKERS,
     show_progress: bool = True,
 ) -> tuple[Path, int]:
     """
-    Merge GeoPackage files to GeoParquet format.
+    Merge daily files to GeoParquet format.
 
-    Uses geopandas native GeoParquet support for proper geometry encoding.
+    Files are read concurrently and streamed in order through a single
+    ParquetWriter, so memory use is bounded by a few daily files rather
+    than the merged total. Every file is conformed to OUTPUT_SCHEMA.
+    Progress is reported in rows, sized up front from file metadata when available.
 
     Args:
-        gpkg_files: List of GeoPackage file paths
+        gpkg_files: List of daily file paths
         output_path: Output parquet file path
-        batch_size: Files to process per batch (for progress display)
+        workers: Number of files to read concurrently
         show_progress: Show tqdm progress bar
 
     Returns:
         Tuple of (output path, total row count)
     """
-    iterator = gpkg_files
+    total_rows = 0
+    expected_rows = None
     if show_progress:
-        iterator = tqdm(gpkg_files, desc="Reading files")
-
-    # Read all files
-    gdfs = [gpd.read_file(f) for f in iterator]
-    total_rows = sum(len(gdf) for gdf in gdfs)
-
-    if show_progress:
-        print("Concatenating and writing parquet...")
-
-    # Concatenate and write
-    combined = pd.concat(gdfs, ignore_index=True)
-    combined = gpd.GeoDataFrame(combined, crs="EPSG:4326")
-    combined.to_parquet(output_path)
-
-    # Cleanup
-    del gdfs
-    del combined
-    gc.collect()
+        counts = [count_rows(f) for f in gpkg_files]
+        # Any unknown count just leaves the progress bar open-ended
+        expected_rows = None if None in counts else sum(counts)
+
+    with (
+        pq.ParquetWriter(output_path, OUTPUT_SCHEMA, compression="zstd") as writer,
+        tqdm(total=expected_rows, desc="Merging", unit="rows", disable=not show_progress) as pbar,
+    ):
+        for table in iter_tables(gpkg_files, workers):
+            writer.write_table(conform_table(table, OUTPUT_SCHEMA))
+            total_rows += table.num_rows
+            pbar.update(table.num_rows)
+            del table
 
     return output_path, total_rows
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Merge GeoPackage files into a single GeoParquet file"
+        description="Merge daily GeoParquet/GeoPackage files into a single GeoParquet file"
     )
     parser.add_argument(
         "--input-dir",
         "-i",
         type=Path,
         default=Path("output"),
-        help="Input directory containing gpkg files (default: output)",
+        help="Input directory containing daily files (default: output)",
     )
     parser.add_argument(
         "--output",
@@ -154,11 +253,11 @@ def main():
         help="End date filter (YYYY-MM-DD)",
     )
     parser.add_argument(
-        "--batch-size",
-        "-b",
+        "--workers",
+        "-w",
         type=int,
-        default=10,
-        help="Files to process per batch (default: 10)",
+        default=READ_WORKERS,
+        help=f"Files to read concurrently (default: {READ_WORKERS})",
     )
 
     args = parser.parse_args()
@@ -167,19 +266,15 @@ def main():
     gpkg_files = get_gpkg_files(args.input_dir, args.start_date, args.end_date)
 
     if not gpkg_files:
-        print("No GeoPackage files found matching criteria")
+        print("No daily files found matching criteria")
         return 1
 
-    print(f"Found {len(gpkg_files)} GeoPackage files")
+    print(f"Found {len(gpkg_files)} daily files")
     if args.start_date or args.end_date:
         print(f"Date range: {args.start_date or 'start'} to {args.end_date or 'end'}")
 
     # Merge
-    output_path, total_rows = merge_to_parquet(
-        gpkg_files,
-        args.output,
-        batch_size=args.batch_size,
-    )
+    output_path, total_rows = merge_to_parquet(gpkg_files, args.output, workers=args.workers)
 
     # Report
     file_size_mb = output_path.stat().st_size / (1024 * 1024)
@@ -7,6 +7,67 @@ from pathlib import Path
 
 import geopandas as gpd
 import matplotlib.pyplot as plt
+import numpy as np
+
+PLOT_DPI = 150  # figure and saved image resolution; the raster is sized in these pixels
+SPREAD_PIXELS = 3  # grow each occupied pixel by this much so isolated positions stay visible
+
+
+def rasterize_vessel_types(
+    x: np.ndarray,
+    y: np.ndarray,
+    vessel_type: np.ndarray,
+    extent: tuple[float, float, float, float],
+    width: int,
+    height: int,
+) -> np.ndarray:
+    """
+    Bin points into a raster holding the most frequent vessel type in each pixel.
+
+    Args:
+        x: Point x coordinates (longitude)
+        y: Point y coordinates (latitude)
+        vessel_type: Vessel type of each point
+        extent: (min_x, max_x, min_y, max_y) covered by the raster
+        width: Raster width in pixels
+        height: Raster height in pixels
+
+    Returns:
+        (height, width) float array, NaN where a pixel has no points
+    """
+    min_x, max_x, min_y, max_y = extent
+    ix = np.clip(((x - min_x) / (max_x - min_x) * width).astype(np.int64), 0, width - 1)
+    iy = np.clip(((y - min_y) / (max_y - min_y) * height).astype(np.int64), 0, height - 1)
+
+    # Count each (pixel, vessel type) pair, then keep the largest count per pixel
+    types, codes = np.unique(vessel_type, return_inverse=True)
+    pairs, counts = np.unique((iy * width + ix) * len(types) + codes, return_counts=True)
+    pixels = pairs // len(types)
+    order = np.lexsort((counts, pixels))
+    pixels, pairs = pixels[order], pairs[order]
+    last = np.append(pixels[1:] != pixels[:-1], True)
+
+    image = np.full(height * width, np.nan)
+    image[pixels[last]] = types[pairs[last] % len(types)]
+    return image.reshape(height, width)
+
+
+def spread_pixels(image: np.ndarray, px: int) -> np.ndarray:
+    """
+    Grow non-empty (non-NaN) pixels into empty neighbours within px pixels.
+    Occupied pixels keep their own value. Equivalent to datashader's tf.spread.
+    """
+    height, width = image.shape
+    padded = np.pad(image, px, constant_values=np.nan)
+    spread = image.copy()
+
+    for dy in range(2 * px + 1):
+        for dx in range(2 * px + 1):
+            shifted = padded[dy : dy + height, dx : dx + width]
+            fill = np.isnan(spread) & ~np.isnan(shifted)
+            spread[fill] = shifted[fill]
+
+    return spread
 
 
 def plot_ais(parquet_path: str, output_path: str | None = None) -> None:
@@ -19,20 +80,35 @@ def plot_ais(parquet_path: str, output_path: str | None = None) -> None:
     """
     gdf = gpd.read_parquet(parquet_path)
 
-    fig, ax = plt.subplots(figsize=(12, 10))
-
-    # Plot vessel positions colored by vessel type
-    scatter = ax.scatter(
-        gdf.geometry.x,
-        gdf.geometry.y,
-        c=gdf["VesselType"],
-        cmap="tab20",
-        alpha=0.6,
-        s=20,
-    )
-
-    # Add colorbar
-    plt.colorbar(scatter, ax=ax, label="Vessel Type")
+    fig, ax = plt.subplots(figsize=(12, 10), dpi=PLOT_DPI)
+
+    # Rasterize positions (colored by vessel type) instead of drawing one marker per point
+    x = gdf.geometry.x.to_numpy()
+    y = gdf.geometry.y.to_numpy()
+    vessel_type = gdf["VesselType"].to_numpy(dtype=float)
+
+    # Nothing to color when there are no positions or no known vessel types;
+    # only the axes and stats are drawn then
+    raster = None
+    if np.isfinite(vessel_type).any():
+        min_x, min_y, max_x, max_y = gdf.total_bounds
+        max_x = max(max_x, min_x + 1e-6)
+        max_y = max(max_y, min_y + 1e-6)
+        extent = (min_x, max_x, min_y, max_y)
+
+        # Placeholder image; the raster is filled in once the axes' pixel size is known
+        raster = ax.imshow(
+            np.full((1, 1), np.nan),
+            origin="lower",
+            extent=extent,
+            cmap="tab20",
+            vmin=np.nanmin(vessel_type),
+            vmax=np.nanmax(vessel_type),
+            interpolation="nearest",
+        )
+
+        # Add colorbar
+        plt.colorbar(raster, ax=ax, label="Vessel Type")
 
     # Labels and title
     ax.set_xlabel("Longitude")
@@ -61,8 +137,16 @@ def plot_ais(parquet_path: str, output_path: str | None = None) -> None:
 
     plt.tight_layout()
 
+    # One raster cell per screen pixel of the final axes, so no cell is dropped when drawn
+    if raster is not None:
+        fig.canvas.draw()
+        bbox = ax.get_window_extent()
+        width, height = max(1, round(bbox.width)), max(1, round(bbox.height))
+        image = rasterize_vessel_types(x, y, vessel_type, extent, width, height)
+        raster.set_data(spread_pixels(image, SPREAD_PIXELS))
+
     if output_path:
-        plt.savefig(output_path, dpi=150, bbox_inches="tight")
+        plt.savefig(output_path, dpi=PLOT_DPI, bbox_inches="tight")
         print(f"Plot saved to: {output_path}")
     else:
         plt.show()
@@ -1,29 +1,79 @@
 #!/usr/bin/env python3
 """
-Process AIS data: filter by wind farm lease polygons and convert to GeoPackage.
+Process AIS data: filter by wind farm lease polygons and convert to GeoParquet.
 Uses polars for memory-efficient CSV processing, then spatial join with lease boundaries.
 """
 
+import os
+import pickle
 from functools import lru_cache
 from pathlib import Path
 
 import geopandas as gpd
+import numpy as np
 import polars as pl
-from shapely.geometry import Point
+import shapely
 
-from config import EXCLUDED_VESSEL_TYPES, LEASE_GEOJSON
+from config import AIS_COLUMNS, AIS_SCHEMA, EXCLUDED_VESSEL_TYPES, LEASE_CACHE, LEASE_GEOJSON
+
+MASK_RESOLUTION = 0.01  # degrees per cell of the lease raster pre-filter
 
 
 @lru_cache(maxsize=1)
+def load_lease_cache() -> tuple[gpd.GeoDataFrame, shapely.STRtree]:
+    """
+    Load and cache the reprojected lease boundaries together with their STRtree.
+    Both are pickled beside the GeoJSON so new processes skip parsing and
+    reprojection; the pickle is rebuilt whenever the GeoJSON is newer.
+    """
+    cached = None
+    if LEASE_CACHE.exists() and LEASE_CACHE.stat().st_mtime >= LEASE_GEOJSON.stat().st_mtime:
+        try:
+            with open(LEASE_CACHE, "rb") as f:
+                cached = pickle.load(f)
+        except Exception as e:
+            # Corrupt, truncated or written by other library versions - rebuild it
+            print(f"Ignoring unreadable lease cache {LEASE_CACHE}: {e}")
+
+    if cached is not None:
+        gdf, tree = cached
+    else:
+        gdf = gpd.read_file(LEASE_GEOJSON)
+        # Reproject to WGS84 (same as AIS data)
+        gdf = gdf.to_crs("EPSG:4326")
+        tree = shapely.STRtree(gdf.geometry.values)
+
+        # Write then rename, so concurrent workers never read a partial pickle.
+        # The cache is only an optimization: failing to write it is not an error
+        tmp_path = LEASE_CACHE.with_name(f"{LEASE_CACHE.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump((gdf, tree), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, LEASE_CACHE)
+        except OSError as e:
+            print(f"Could not write lease cache {LEASE_CACHE}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    # Prepared geometries do not survive pickling, so prepare after loading
+    shapely.prepare(tree.geometries)
+
+    return gdf, tree
+
+
 def load_lease_boundaries() -> gpd.GeoDataFrame:
     """
-    Load and cache the wind farm lease boundaries.
-    Reprojects from EPSG:3857 to EPSG:4326 to match AIS data.
+    Load the wind farm lease boundaries.
+    Reprojected from EPSG:3857 to EPSG:4326 to match AIS data.
+    """
+    return load_lease_cache()[0]
+
+
+def load_lease_tree() -> shapely.STRtree:
+    """
+    Load the STRtree over the lease polygons (its geometries are prepared).
+    Tree indices match the row positions of load_lease_boundaries().
     """
-    gdf = gpd.read_file(LEASE_GEOJSON)
-    # Reproject to WGS84 (same as AIS data)
-    gdf = gdf.to_crs("EPSG:4326")
-    return gdf
+    return load_lease_cache()[1]
 
 
 def get_lease_bounds() -> dict:
@@ -33,21 +83,79 @@ def get_lease_bounds() -> dict:
     """
     gdf = load_lease_boundaries()
     bounds = gdf.total_bounds  # [minx, miny, maxx, maxy]
+    # Plain floats, not numpy float64: polars would otherwise cast the Float32
+    # LAT/LON columns up to Float64 for every comparison
     return {
-        "min_lon": bounds[0],
-        "min_lat": bounds[1],
-        "max_lon": bounds[2],
-        "max_lat": bounds[3],
+        "min_lon": float(bounds[0]),
+        "min_lat": float(bounds[1]),
+        "max_lon": float(bounds[2]),
+        "max_lat": float(bounds[3]),
     }
 
 
+@lru_cache(maxsize=1)
+def load_lease_mask() -> np.ndarray:
+    """
+    Rasterize the lease polygons onto a MASK_RESOLUTION grid over the lease bounds.
+    A cell is True if it touches any lease polygon, so the mask never rejects a
+    point inside a lease. Cell [0, 0] is at the (min_lat, min_lon) corner.
+    """
+    leases = load_lease_boundaries()
+    bounds = get_lease_bounds()
+    min_lon, min_lat = bounds["min_lon"], bounds["min_lat"]
+    res = MASK_RESOLUTION
+    width = int((bounds["max_lon"] - min_lon) / res) + 1
+    height = int((bounds["max_lat"] - min_lat) / res) + 1
+
+    mask = np.zeros((height, width), dtype=bool)
+
+    # Only test the cells under each polygon's own bounding box
+    for geom in leases.geometry.values:
+        x0, y0, x1, y1 = geom.bounds
+        ix, iy = np.meshgrid(
+            np.arange(int((x0 - min_lon) / res), int((x1 - min_lon) / res) + 1),
+            np.arange(int((y0 - min_lat) / res), int((y1 - min_lat) / res) + 1),
+        )
+        cells = shapely.box(
+            min_lon + ix * res,
+            min_lat + iy * res,
+            min_lon + (ix + 1) * res,
+            min_lat + (iy + 1) * res,
+        )
+        # Prepare first - some lease outlines have ~200k vertices
+        shapely.prepare(geom)
+        mask[iy, ix] |= shapely.intersects(geom, cells)
+
+    # Grow by one cell: float32 coordinates can land a point in the neighbouring cell
+    padded = np.pad(mask, 1)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            mask |= padded[dy : dy + height, dx : dx + width]
+
+    return mask
+
+
+def in_lease_mask(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """
+    Fast rejection of points whose mask cell touches no lease polygon.
+    Returns a boolean array; points must already be within the lease bounds.
+    """
+    mask = load_lease_mask()
+    bounds = get_lease_bounds()
+    ix = ((lon - bounds["min_lon"]) / MASK_RESOLUTION).astype(np.int32)
+    iy = ((lat - bounds["min_lat"]) / MASK_RESOLUTION).astype(np.int32)
+    np.clip(ix, 0, mask.shape[1] - 1, out=ix)
+    np.clip(iy, 0, mask.shape[0] - 1, out=iy)
+    return mask[iy, ix]
+
+
 def process_ais(
     csv_path: str,
     output_dir: str = "output",
     output_name: str | None = None,
 ) -> Path | None:
     """
-    Filter AIS data by wind farm lease boundaries and save as GeoPackage.
+    Filter AIS data by wind farm lease boundaries and save as GeoParquet.
 
     Args:
         csv_path: Path to the AIS CSV file
@@ -55,7 +163,7 @@ def process_ais(
         output_name: Output filename (without extension)
 
     Returns:
-        Path to the output GeoPackage file, or None if no data found
+        Path to the output GeoParquet file, or None if no data found
     """
     csv_path = Path(csv_path)
     output_path = Path(output_dir)
@@ -64,7 +172,7 @@ def process_ais(
     if output_name is None:
         output_name = f"ais_{csv_path.stem.replace('AIS_', '')}"
 
-    gpkg_path = output_path / f"{output_name}.gpkg"
+    parquet_path = output_path / f"{output_name}.parquet"
 
     print(f"Loading CSV: {csv_path}")
 
@@ -78,8 +186,9 @@ def process_ais(
 
     # Read CSV with polars (memory efficient)
     # Pre-filter to overall bounding box first (fast numerical filter)
+    # A fixed narrow schema and only the selected columns keep parsing and memory down
     df = (
-        pl.scan_csv(csv_path)
+        pl.scan_csv(csv_path, schema=AIS_SCHEMA)
         .filter(
             # Valid coordinates
             (pl.col("LAT") != 91)
@@ -92,6 +201,7 @@ def process_ais(
             & (pl.col("LON") >= bounds["min_lon"])
             & (pl.col("LON") <= bounds["max_lon"])
         )
+        .select(AIS_COLUMNS)
         .collect()
     )
 
@@ -101,36 +211,54 @@ def process_ais(
         print("Warning: No data found within bounds!")
         return None
 
-    # Convert to GeoDataFrame for spatial join
-    print("Creating geometry...")
-    pdf = df.to_pandas()
-    geometry = [Point(lon, lat) for lon, lat in zip(pdf["LON"], pdf["LAT"], strict=True)]
-    ais_gdf = gpd.GeoDataFrame(pdf, geometry=geometry, crs="EPSG:4326")
+    # Raster pre-filter - drop points in grid cells that touch no lease polygon
+    keep = in_lease_mask(df["LON"].to_numpy(), df["LAT"].to_numpy())
+    df = df.filter(pl.Series(keep))
+
+    print(f"Pre-filtered to {len(df):,} rows near lease polygons")
+
+    if len(df) == 0:
+        print("Warning: No data found near lease polygons!")
+        return None
 
     # Spatial join - keep only points within lease areas
+    # The STRtree gives bounding-box candidates, then contains_xy on the prepared
+    # lease polygons does the exact test; no GeoDataFrame is built until we know
+    # which rows survive
     print("Performing spatial join with lease boundaries...")
-    result = gpd.sjoin(
-        ais_gdf, leases[["geometry", "LEASE_NUMBER"]], how="inner", predicate="within"
-    )
+    tree = load_lease_tree()
+    lon = df["LON"].to_numpy()
+    lat = df["LAT"].to_numpy()
+    points = shapely.points(lon, lat)
+    idx_pts, idx_poly = tree.query(points)
+    inside = shapely.contains_xy(tree.geometries[idx_poly], lon[idx_pts], lat[idx_pts])
+    idx_pts, idx_poly = idx_pts[inside], idx_poly[inside]
 
-    # Drop the index_right column from sjoin
-    if "index_right" in result.columns:
-        result = result.drop(columns=["index_right"])
+    print(f"Filtered to {len(idx_pts):,} rows within lease boundaries")
 
-    print(f"Filtered to {len(result):,} rows within lease boundaries")
-
-    if len(result) == 0:
+    if len(idx_pts) == 0:
         print("Warning: No data found within lease boundaries!")
         return None
 
-    # Save as GeoPackage
-    print(f"Saving GeoPackage: {gpkg_path}")
-    result.to_file(gpkg_path, driver="GPKG")
+    df = df[idx_pts].with_columns(
+        pl.Series("LEASE_NUMBER", leases["LEASE_NUMBER"].to_numpy()[idx_poly], dtype=pl.String)
+    )
+    # Arrow-backed columns keep the declared dtypes (an all-null column stays a
+    # string/int column), so every daily file shares one schema
+    result = gpd.GeoDataFrame(
+        df.to_pandas(use_pyarrow_extension_array=True),
+        geometry=points[idx_pts],
+        crs="EPSG:4326",
+    )
+
+    # Save as GeoParquet
+    print(f"Saving GeoParquet: {parquet_path}")
+    result.to_parquet(parquet_path, compression="zstd", schema_version="1.1.0")
 
-    print(f"Done! Output: {gpkg_path}")
-    print(f"File size: {gpkg_path.stat().st_size / 1024 / 1024:.2f} MB")
+    print(f"Done! Output: {parquet_path}")
+    print(f"File size: {parquet_path.stat().st_size / 1024 / 1024:.2f} MB")
 
-    return gpkg_path
+    return parquet_path
 
 
 if __name__ == "__main__":